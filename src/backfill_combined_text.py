@@ -0,0 +1,68 @@
+"""
+One-time backfill of precombined tender text
+Stores combine_file_texts output on each tender (see COMBINED_TEXT_FIELD in
+tender_service) so the API can skip chunking at request time. Tenders whose
+stored text already matches their file_texts are left alone unless --force is given.
+The ingestion pipeline should write the same field whenever file_texts changes.
+Also ensures the unique tender_id index the API's lookups rely on.
+"""
+
+import argparse
+import logging
+
+import pymongo
+
+from tender_service import (
+    COMBINED_TEXT_FIELD, MONGODB_URI, MONGODB_DB_NAME, MONGODB_PROCESSED_COLLECTION,
+    combine_file_texts, hash_file_texts,
+)
+
+logger = logging.getLogger(__name__)
+
+def ensure_tender_id_index(collection):
+    """Make tender lookups an index seek rather than a collection scan"""
+    try:
+        collection.create_index("tender_id", unique=True)
+        logger.info("Ensured unique index on tender_id")
+    except pymongo.errors.PyMongoError as e:
+        # Typically duplicate tender_ids or a user without createIndex rights
+        logger.warning("Could not create index on tender_id: %s", e)
+
+def backfill(force: bool = False):
+    """Compute and store combined text for every tender that is missing or stale"""
+    client = pymongo.MongoClient(MONGODB_URI)
+    collection = client[MONGODB_DB_NAME][MONGODB_PROCESSED_COLLECTION]
+    updated = skipped = 0
+    try:
+        ensure_tender_id_index(collection)
+        cursor = collection.find(
+            {"file_texts": {"$exists": True}},
+            projection={"tender_id": 1, "file_texts": 1, f"{COMBINED_TEXT_FIELD}.content_hash": 1},
+        )
+        for tender in cursor:
+            file_texts = tender.get("file_texts")
+            if not file_texts:
+                skipped += 1
+                continue
+            
+            content_hash = hash_file_texts(file_texts)
+            stored_hash = (tender.get(COMBINED_TEXT_FIELD) or {}).get("content_hash")
+            if stored_hash == content_hash and not force:
+                skipped += 1
+                continue
+            
+            combined_text = combine_file_texts(file_texts)
+            collection.update_one(
+                {"_id": tender["_id"]},
+                {"$set": {COMBINED_TEXT_FIELD: {"content_hash": content_hash, "text": combined_text}}},
+            )
+            updated += 1
+            logger.info("Stored combined text for tender %s (%d characters)", tender.get("tender_id"), len(combined_text))
+    finally:
+        client.close()
+    logger.info("Backfill finished: %d updated, %d skipped", updated, skipped)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="recompute combined text for every tender")
+    backfill(force=parser.parse_args().force)
@@ -5,11 +5,35 @@
 MAX_FILES_TO_PROCESS = 5  # Maximum number of files to process before selecting largest ones
 TOP_FILES_TO_USE = 5     # Number of largest files to use when exceeding MAX_FILES_TO_PROCESS
 CONTEXT_SIZE = 500      # Number of characters to include before and after keywords in text chunking
+COMBINED_CACHE_MAX_TENDERS = 32  # Number of tenders whose combined document text is kept in memory
+CHUNKING_EXECUTOR_THRESHOLD = 100_000  # Total characters above which chunking runs in a worker process
+CONTEXT_TOKEN_BUDGET = 60000  # Maximum estimated tokens of tender text sent to Gemini per question
+CHARS_PER_TOKEN = 4           # Characters per token used to estimate prompt size
+MIN_DOCUMENT_CHARS = 200      # Combined text shorter than this is treated as an empty tender
+MAX_PROMPT_CHARS = 400_000    # Hard cap on combined text characters sent to Gemini (~100k tokens)
+
+# MongoDB connection pool configuration
+MONGO_MAX_POOL_SIZE = 50                # Upper bound on concurrent connections per process
+MONGO_MIN_POOL_SIZE = 10                # Connections kept open so bursts don't pay TLS/auth setup
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000  # Fail fast when no suitable server is reachable
+MONGO_SOCKET_TIMEOUT_MS = 30000         # Give up on a stalled read instead of hanging the request
+
+# Batch API configuration
+BATCH_MAX_QUESTIONS = 20                # Questions accepted per /ask/batch call; each carries its tender's full text
+BATCH_MAX_PAYLOAD_BYTES = 18_000_000    # Inline batch body cap, kept under Gemini's ~20 MB inline request limit
+BATCH_JOBS_MAX_ENTRIES = 256            # Submitted batches tracked in memory until their answers are collected
 
 # Model configuration
 TEMPERATURE = 0.7         # Controls randomness in responses (0.0-1.0)
 MAX_TOKENS = 50000         # Maximum tokens in the response
 
+# Context caching configuration (enabled with ENABLE_CONTEXT_CACHE, see .env.example)
+CONTEXT_CACHE_TTL_SECONDS = 3600 # Lifetime of a cached tender on Gemini, extended on every cache hit
+
+# Semantic answer cache configuration (enabled with ENABLE_SEMANTIC_CACHE, see .env.example)
+EMBEDDING_MODEL = "models/text-embedding-004"  # Gemini model used to embed questions
+SEMANTIC_CACHE_MAX_ENTRIES = 200            # Question/answer pairs kept per tender
+
 # System prompt configuration
 SYSTEM_PROMPT = """You are an expert tender document analyzer. Your role is to carefully analyze tender documents and provide accurate, detailed answers to questions about them.
 
@@ -1,16 +1,39 @@
+import asyncio
+import hashlib
+import heapq
 import json
+import logging
+import multiprocessing
 import os
-from typing import Dict, Any, Optional, List
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from functools import partial
+from typing import Dict, Any, Callable, Optional, List, Tuple
 
+import httpx
+import numpy as np
 import pymongo
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 # from google import genai
-from google.generativeai import types
+from google.generativeai import caching, types
 # Import model tuning parameters from config
-from config import MAX_FILES_TO_PROCESS, TOP_FILES_TO_USE, TEMPERATURE, MAX_TOKENS, SYSTEM_PROMPT
+from config import (
+    MAX_FILES_TO_PROCESS, TOP_FILES_TO_USE, COMBINED_CACHE_MAX_TENDERS, CHUNKING_EXECUTOR_THRESHOLD,
+    CONTEXT_TOKEN_BUDGET, CHARS_PER_TOKEN, MIN_DOCUMENT_CHARS, MAX_PROMPT_CHARS,
+    TEMPERATURE, MAX_TOKENS, SYSTEM_PROMPT, CONTEXT_CACHE_TTL_SECONDS,
+    EMBEDDING_MODEL, SEMANTIC_CACHE_MAX_ENTRIES,
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+    BATCH_MAX_QUESTIONS, BATCH_MAX_PAYLOAD_BYTES, BATCH_JOBS_MAX_ENTRIES,
+)
 
 
 import google.generativeai as genai
@@ -19,6 +42,8 @@ import google.generativeai as genai
 # Import text chunker for optimized document processing
 from text_chunker import chunk_tender_documents
 
+logger = logging.getLogger(__name__)
+
 # Define API models
 class TenderRequest(BaseModel):
     tender_id: str
@@ -30,65 +55,63 @@ class TenderResponse(BaseModel):
 class ErrorResponse(BaseModel):
     error: str
 
+class BatchResponse(BaseModel):
+    batch_id: str
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    state: str
+    answers: Optional[List[str]] = None
+
 # Define lifespan context manager for startup events
-from contextlib import asynccontextmanager
-import traceback
-import sys
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Connect to MongoDB on startup
-    global mongo_client, db, collection
+    # Set up shared clients on startup
+    global gemini_model, chunking_executor
     try:
-        print("\n[STARTUP] Initializing application...")
-        print(f"[STARTUP] Gemini Model: {GEMINI_MODEL}")
-        print(f"[STARTUP] MongoDB URI: {MONGODB_URI[:20]}...")
-        print(f"[STARTUP] MongoDB DB: {MONGODB_DB_NAME}")
-        print(f"[STARTUP] MongoDB Collection: {MONGODB_PROCESSED_COLLECTION}")
-        print(f"[STARTUP] MAX_FILES_TO_PROCESS: {MAX_FILES_TO_PROCESS}")
-        print(f"[STARTUP] TOP_FILES_TO_USE: {TOP_FILES_TO_USE}")
+        logger.info("Initializing application...")
+        logger.info("Gemini Model: %s", GEMINI_MODEL)
+        logger.info("MongoDB URI: %s...", MONGODB_URI[:20])
+        logger.info("MongoDB DB: %s", MONGODB_DB_NAME)
+        logger.info("MongoDB Collection: %s", MONGODB_PROCESSED_COLLECTION)
+        logger.info("MAX_FILES_TO_PROCESS: %s", MAX_FILES_TO_PROCESS)
+        logger.info("TOP_FILES_TO_USE: %s", TOP_FILES_TO_USE)
         
         # Configure error handling for uncaught exceptions
         def handle_exception(exc_type, exc_value, exc_traceback):
-            print(f"[ERROR] Uncaught exception: {exc_type.__name__}: {exc_value}")
-            traceback.print_exception(exc_type, exc_value, exc_traceback)
-            return sys.__excepthook__(exc_type, exc_value, exc_traceback)
+            logger.critical("Uncaught exception: %s: %s", exc_type.__name__, exc_value,
+                            exc_info=(exc_type, exc_value, exc_traceback))
             
         sys.excepthook = handle_exception
         
-        # Connect to MongoDB
-        print("[STARTUP] Connecting to MongoDB...")
-        mongo_client = pymongo.MongoClient(MONGODB_URI)
-        db = mongo_client[MONGODB_DB_NAME]
-        collection = db[MONGODB_PROCESSED_COLLECTION]
+        # MongoDB connects lazily on the first tender lookup in each worker process
         
-        # Verify connection
-        count = collection.count_documents({})
-        print(f"[STARTUP] Connected to MongoDB. Found {count} documents in collection {MONGODB_PROCESSED_COLLECTION}")
-                    
-        # Test Gemini API connection
-        print("[STARTUP] Testing Gemini API connection...")
-        try:
-            model = genai.GenerativeModel(model_name=GEMINI_MODEL)
-            response = model.generate_content("Explain how AI works in a few words")
-            print(f"[STARTUP] Gemini API test successful: {response.text}")
-        except Exception as e:
-            print(f"[STARTUP] Gemini API test failed: {str(e)}")
-            traceback.print_exc()
-            print("[STARTUP] Continuing startup despite Gemini API test failure")
-
-        print("[STARTUP] Application initialized successfully")
+        # Create the Gemini model once and reuse it for every request
+        gemini_model = create_gemini_model()
+        
+        # Worker processes for CPU-bound document chunking, so it doesn't stall the event loop.
+        # Forkserver rather than fork: forking a process that already runs httpx and gRPC threads can deadlock the child
+        chunking_executor = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+        
+        logger.info("Application initialized successfully")
     except Exception as e:
-        print(f"[STARTUP] Error during startup: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error during startup: %s", e)
         raise
     
     yield  # This is where the app runs
     
     # Close MongoDB connection on shutdown
-    if mongo_client:
+    if mongo_client and mongo_pid == os.getpid():
         mongo_client.close()
-        print("[SHUTDOWN] MongoDB connection closed")
+        logger.info("MongoDB connection closed")
+    
+    if chunking_executor:
+        chunking_executor.shutdown(cancel_futures=True)
+        logger.info("Chunking worker processes stopped")
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -108,10 +131,26 @@ app.add_middleware(
 # Load environment variables
 load_dotenv()
 
+# Logging configuration; set LOG_LEVEL=DEBUG for per-request diagnostics
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="[%(levelname)s] %(message)s")
+
 # Gemini API configuration
 GEMINI_MODEL = os.getenv("GEMINI_MODEL")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 genai.configure(api_key=GEMINI_API_KEY)
+ENABLE_BATCH = os.getenv("ENABLE_BATCH", "false").lower() == "true"
+# Gemini context cache: billed for storage, and each worker process keeps its own cache per tender
+ENABLE_CONTEXT_CACHE = os.getenv("ENABLE_CONTEXT_CACHE", "false").lower() == "true"
+# Semantic answer cache: costs an embedding call per question, and near-identical questions
+# about different figures (e.g. EMD vs performance security amount) can share an answer
+ENABLE_SEMANTIC_CACHE = os.getenv("ENABLE_SEMANTIC_CACHE", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+GEMINI_API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+GEMINI_BATCH_TIMEOUT_SECONDS = 120
+GENERATION_CONFIG = {
+    "temperature": TEMPERATURE,
+    "max_output_tokens": MAX_TOKENS,
+}
 
 # MongoDB configuration
 MONGODB_URI = os.getenv("MONGODB_URI")
@@ -122,45 +161,143 @@ MONGODB_PROCESSED_COLLECTION = os.getenv("MONGODB_PROCESSED_COLLECTION")
 
 
 
-# MongoDB client
+# Tender field holding combined text precomputed at ingestion: {"content_hash": ..., "text": ...}
+COMBINED_TEXT_FIELD = "combined_text_v1"
+
+# MongoDB client, created lazily by get_collection in the process that uses it
 mongo_client = None
 db = None
 collection = None
+mongo_pid = None
+mongo_lock = threading.Lock()
+
+# Gemini model shared by all uncached requests
+gemini_model = None
+
+# Process pool for chunking large tenders
+chunking_executor = None
+
+# Combined document cache: tender_id -> (file_texts hash, combined text)
+_combined_cache: Dict[str, Tuple[str, str]] = {}
 
+# Gemini context cache: tender_id -> (cached content, model built on it, file_texts hash, expiry timestamp)
+# Both objects are kept so that cache hits make no extra round trip to look the cache up by name
+tender_cache: Dict[str, Tuple[caching.CachedContent, genai.GenerativeModel, str, float]] = {}
 
+# Tenders Gemini refused to cache: tender_id -> (file_texts hash, timestamp after which to try again)
+refused_tender_caches: Dict[str, Tuple[str, float]] = {}
+
+# Semantic answer cache: tender_id -> (file_texts hash, unit-length question embeddings, answers)
+semantic_cache: Dict[str, Tuple[str, np.ndarray, List[str]]] = {}
+
+# Submitted batch jobs, oldest first: batch_id -> (number of questions, answers known without Gemini by index)
+# Entries are dropped once their answers have been returned, and only live in this process
+batch_jobs: Dict[str, Tuple[int, Dict[int, str]]] = {}
+
+
+def get_collection():
+    """Return the tender collection, creating this process's MongoDB client on first use
+    A client inherited through fork is never reused, so each worker builds its own
+    connection pool only once it actually serves a request.
+    """
+    global mongo_client, db, collection, mongo_pid
+    if collection is not None and mongo_pid == os.getpid():
+        return collection
+    
+    with mongo_lock:
+        if collection is None or mongo_pid != os.getpid():
+            logger.info("Connecting to MongoDB...")
+            # Tender texts compress well and are read-only here, so compress the wire
+            # protocol and let secondaries serve the reads
+            mongo_client = pymongo.MongoClient(
+                MONGODB_URI,
+                compressors="zstd,zlib",
+                read_preference=pymongo.ReadPreference.SECONDARY_PREFERRED,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                retryReads=True,
+            )
+            db = mongo_client[MONGODB_DB_NAME]
+            # The tender_id index is created by backfill_combined_text.py, not on the request path
+            collection = db[MONGODB_PROCESSED_COLLECTION]
+            mongo_pid = os.getpid()
+    return collection
 
 def get_tender_by_id(tender_id: str) -> Optional[Dict[str, Any]]:
     """Find a tender by its ID in MongoDB"""
     try:
-        print(f"[DEBUG] Attempting to find tender with ID: {tender_id}")
-        tender = collection.find_one({"tender_id": tender_id})
+        logger.debug("Attempting to find tender with ID: %s", tender_id)
+        # Only fetch the fields the API uses instead of the whole tender document
+        tender = get_collection().find_one(
+            {"tender_id": tender_id},
+            projection={"file_texts": 1, COMBINED_TEXT_FIELD: 1, "_id": 0},
+        )
+        if not logger.isEnabledFor(logging.DEBUG):
+            return tender
         if tender:
-            print(f"[DEBUG] Found tender with ID: {tender_id}")
-            print(f"[DEBUG] Tender keys: {list(tender.keys())}")
+            logger.debug("Found tender with ID: %s", tender_id)
+            logger.debug("Tender keys: %s", list(tender.keys()))
             if 'file_texts' in tender:
                 file_texts_type = type(tender['file_texts']).__name__
-                print(f"[DEBUG] file_texts is of type: {file_texts_type}")
+                logger.debug("file_texts is of type: %s", file_texts_type)
                 if isinstance(tender['file_texts'], dict):
-                    print(f"[DEBUG] file_texts contains {len(tender['file_texts'])} files")
+                    logger.debug("file_texts contains %d files", len(tender['file_texts']))
                 elif isinstance(tender['file_texts'], str):
-                    print(f"[DEBUG] file_texts is a string of length {len(tender['file_texts'])}")
+                    logger.debug("file_texts is a string of length %d", len(tender['file_texts']))
                 else:
-                    print(f"[DEBUG] file_texts is of unexpected type: {file_texts_type}")
+                    logger.debug("file_texts is of unexpected type: %s", file_texts_type)
             else:
-                print(f"[DEBUG] Tender does not contain 'file_texts' key")
+                logger.debug("Tender does not contain 'file_texts' key")
         else:
-            print(f"[DEBUG] No tender found with ID: {tender_id}")
+            logger.debug("No tender found with ID: %s", tender_id)
         return tender
     except Exception as e:
-        print(f"[ERROR] Error retrieving tender from MongoDB: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error retrieving tender from MongoDB: %s", e)
         return None
 
-def combine_file_texts(file_texts: Dict[str, str]) -> str:
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of Gemini tokens in a text without calling the API"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def pack_under_budget(chunks: List[str], budget: int) -> Tuple[List[str], int]:
+    """Keep chunks in rank order while their estimated tokens, separators included, fit the budget
+    A chunk too big for the space left is skipped so smaller ones after it still get in. If not
+    even one fits, the first chunk is cut down to the budget so that chunks never pack to nothing.
+    Returns the kept chunks and the tokens they use.
+    """
+    separator_tokens = estimate_tokens("\n\n---\n\n")
+    packed: List[str] = []
+    used = 0
+    for chunk in chunks:
+        cost = estimate_tokens(chunk) + (separator_tokens if packed else 0)
+        if used + cost <= budget:
+            packed.append(chunk)
+            used += cost
+    if chunks and not packed and budget > 0:
+        logger.info("Top chunk alone exceeds the token budget, truncating it to ~%d tokens", budget)
+        packed = [chunks[0][:budget * CHARS_PER_TOKEN]]
+        used = estimate_tokens(packed[0])
+    return packed, used
+
+def count_whole_files(texts: List[str], budget: int) -> int:
+    """Count how many leading texts fit the budget whole, charging a separator between each pair"""
+    remaining_tokens = budget
+    for i, text in enumerate(texts):
+        if i:
+            remaining_tokens -= estimate_tokens("\n\n---\n\n")
+        if estimate_tokens(text) > remaining_tokens:
+            return i
+        remaining_tokens -= estimate_tokens(text)
+    return len(texts)
+
+def combine_file_texts(file_texts: Dict[str, str], executor: Optional[Executor] = None) -> str:
     """Combine all file texts into a single string
     First chunks the documents to extract relevant qualification criteria and clauses,
-    then combines the most relevant chunks with the largest files if needed.
+    then combines the most relevant chunks with the largest files if needed. The result
+    is kept within CONTEXT_TOKEN_BUDGET estimated tokens. Files are chunked in parallel
+    on the executor, if one is given.
     """
     if not file_texts:
         return ""
@@ -168,8 +305,8 @@ def combine_file_texts(file_texts: Dict[str, str]) -> str:
     # Handle different possible structures in MongoDB
     if isinstance(file_texts, dict):
         # Process the documents to extract relevant chunks by criteria
-        print("Chunking documents by qualification criteria and important clauses...")
-        chunked_documents = chunk_tender_documents(file_texts)
+        logger.debug("Chunking documents by qualification criteria and important clauses...")
+        chunked_documents = chunk_tender_documents(file_texts, executor)
         
         # Extract the most relevant chunks for each category
         relevant_chunks = []
@@ -180,97 +317,301 @@ def combine_file_texts(file_texts: Dict[str, str]) -> str:
                 category_chunks = chunked_documents['categorized_chunks'][category]
                 # Add all chunks from this category (we'll limit the total later)
                 for chunk in category_chunks:
-                    relevant_chunks.append(chunk['text'])
+                    relevant_chunks.append(chunk.text)
         
         # Add specific criteria extractions
         for criteria_type, extractions in chunked_documents['specific_criteria'].items():
             for extraction in extractions:
-                relevant_chunks.append(extraction['text'])
+                relevant_chunks.append(extraction.text)
         
-        # Remove duplicates while preserving order
-        unique_chunks = []
-        for chunk in relevant_chunks:
-            if chunk not in unique_chunks:
-                unique_chunks.append(chunk)
+        # Remove duplicates, ranking chunks matched by more categories and criteria first
+        # (the sort is stable, so ties keep their original order)
+        match_counts = Counter(relevant_chunks)
+        unique_chunks = sorted(match_counts, key=match_counts.__getitem__, reverse=True)
         
-        # If we have enough relevant chunks, use those
+        # If we have enough relevant chunks, use as many as fit the token budget
         if len(unique_chunks) >= TOP_FILES_TO_USE:
-            print(f"Found {len(unique_chunks)} relevant chunks based on criteria")
-            combined_text = "\n\n---\n\n".join(unique_chunks[:TOP_FILES_TO_USE*2])  # Use twice as many chunks as we would files
-            return combined_text
+            packed_chunks, used_tokens = pack_under_budget(unique_chunks, CONTEXT_TOKEN_BUDGET)
+            logger.info("Found %d relevant chunks based on criteria, using %d (~%d tokens)",
+                        len(unique_chunks), len(packed_chunks), used_tokens)
+            return "\n\n---\n\n".join(packed_chunks)
         
         # If we don't have enough relevant chunks, fall back to using the largest files
-        print(f"Found only {len(unique_chunks)} relevant chunks, supplementing with largest files")
+        logger.info("Found only %d relevant chunks, supplementing with largest files", len(unique_chunks))
         
         # If there are more than MAX_FILES_TO_PROCESS files, only use the TOP_FILES_TO_USE largest files
         if len(file_texts) > MAX_FILES_TO_PROCESS:
-            print(f"Found {len(file_texts)} files, selecting the {TOP_FILES_TO_USE} largest ones")
-            # Sort files by size (number of characters)
-            files_by_size = sorted(file_texts.items(), key=lambda x: len(x[1]), reverse=True)
-            # Take only the TOP_FILES_TO_USE largest files
-            selected_files = files_by_size[:TOP_FILES_TO_USE]
-            
-            # Combine the texts from the selected files
-            combined_text = "\n\n---\n\n".join([text for _, text in selected_files])
-            
-            # If we have any unique chunks, prepend them to the combined text
-            if unique_chunks:
-                chunk_text = "\n\n---\n\n".join(unique_chunks[:TOP_FILES_TO_USE])
-                combined_text = chunk_text + "\n\n==========\n\n" + combined_text
-                
-            return combined_text
+            logger.info("Found %d files, selecting the %s largest ones", len(file_texts), TOP_FILES_TO_USE)
+            # Take only the TOP_FILES_TO_USE largest files (by number of characters) without sorting them all
+            largest_files = heapq.nlargest(TOP_FILES_TO_USE, file_texts.items(), key=lambda x: len(x[1]))
+            selected_texts = [text for _, text in largest_files]
+            prepended_chunks = unique_chunks[:TOP_FILES_TO_USE]
         else:
             # If we have fewer files than the limit, use all of them
-            print(f"Using all {len(file_texts)} files")
-            combined_text = "\n\n---\n\n".join(file_texts.values())
-            
-            # If we have any unique chunks, prepend them to the combined text
-            if unique_chunks:
-                chunk_text = "\n\n---\n\n".join(unique_chunks)
-                combined_text = chunk_text + "\n\n==========\n\n" + combined_text
-                
-            return combined_text
+            logger.info("Using all %d files", len(file_texts))
+            selected_texts = list(file_texts.values())
+            prepended_chunks = unique_chunks
+        
+        # Collect the pieces and join them once, so each large file text is copied a single time
+        parts: List[str] = []
+        
+        # Pack the chunks first, since they take priority over the file texts
+        prepended_chunks, used_tokens = pack_under_budget(prepended_chunks, CONTEXT_TOKEN_BUDGET)
+        file_budget = CONTEXT_TOKEN_BUDGET - used_tokens - estimate_tokens("\n\n==========\n\n")
+        
+        # Chunks are cut from the tender files, so drop the ones a file sent whole already contains.
+        # Dropping chunks only frees budget, so those files are still sent whole afterwards
+        if prepended_chunks:
+            whole_texts = selected_texts[:count_whole_files(selected_texts, file_budget)]
+            prepended_chunks = [
+                chunk for chunk in prepended_chunks
+                if not any(chunk in text for text in whole_texts)
+            ]
+            prepended_chunks, used_tokens = pack_under_budget(prepended_chunks, used_tokens)
+        
+        # If we have any unique chunks left, prepend them to the file texts
+        for chunk in prepended_chunks:
+            if parts:
+                parts.append("\n\n---\n\n")
+            parts.append(chunk)
+        if parts:
+            parts.append("\n\n==========\n\n")
+            used_tokens += estimate_tokens("\n\n==========\n\n")
+        
+        # Add whole files while they fit the remaining budget, then cut the next one off at the limit
+        remaining_tokens = CONTEXT_TOKEN_BUDGET - used_tokens
+        for i, text in enumerate(selected_texts):
+            if i:
+                parts.append("\n\n---\n\n")
+                remaining_tokens -= estimate_tokens("\n\n---\n\n")
+            if estimate_tokens(text) > remaining_tokens:
+                logger.info("Token budget reached, truncating file text to ~%d tokens", max(remaining_tokens, 0))
+                parts.append(text[:max(remaining_tokens, 0) * CHARS_PER_TOKEN])
+                break
+            parts.append(text)
+            remaining_tokens -= estimate_tokens(text)
+        
+        return "".join(parts)
     elif isinstance(file_texts, str):
         # If it's already a single string, just return it
         return file_texts
     else:
         # If it's neither a dict nor a string, return an empty string
-        print(f"[WARNING] file_texts is of unexpected type: {type(file_texts)}")
+        logger.warning("file_texts is of unexpected type: %s", type(file_texts))
         return ""
 
 
 
-def get_gemini_response(prompt: str, system_prompt: str):
-    """Get response from Gemini API"""
+def hash_file_texts(file_texts: Dict[str, str]) -> str:
+    """Fingerprint a tender's file texts so cached work is invalidated when the documents change"""
+    digest = hashlib.md5()
+    if isinstance(file_texts, dict):
+        for file_name, text in sorted(file_texts.items()):
+            digest.update(str(file_name).encode("utf-8", "surrogatepass"))
+            digest.update(b"\0")
+            digest.update(str(text).encode("utf-8", "surrogatepass"))
+            digest.update(b"\0")
+    else:
+        digest.update(str(file_texts).encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+async def get_combined_text(tender_id: str, file_texts: Dict[str, str], content_hash: str) -> str:
+    """Return the combined text for a tender, reusing the previous result if its documents are unchanged
+    Large tenders are chunked in worker processes, one file per worker when there are several;
+    small ones stay in-process to avoid the IPC overhead.
+    """
+    cached = _combined_cache.get(tender_id)
+    if cached and cached[0] == content_hash:
+        logger.info("Reusing combined text for tender %s", tender_id)
+        return cached[1]
+    
+    if (
+        chunking_executor
+        and isinstance(file_texts, dict)
+        and sum(map(len, file_texts.values())) > CHUNKING_EXECUTOR_THRESHOLD
+    ):
+        loop = asyncio.get_running_loop()
+        if len(file_texts) > 1:
+            # Fan the files out over the pool from a thread, keeping the event loop free
+            combined_text = await loop.run_in_executor(None, combine_file_texts, file_texts, chunking_executor)
+        else:
+            combined_text = await loop.run_in_executor(chunking_executor, combine_file_texts, file_texts)
+    else:
+        combined_text = combine_file_texts(file_texts)
+    
+    _combined_cache.pop(tender_id, None)
+    if len(_combined_cache) >= COMBINED_CACHE_MAX_TENDERS:
+        # Evict the least recently combined tender
+        _combined_cache.pop(next(iter(_combined_cache)))
+    _combined_cache[tender_id] = (content_hash, combined_text)
+    return combined_text
+
+def get_cached_tender(tender_id: str, content_hash: str) -> Optional[genai.GenerativeModel]:
+    """Return the model for a live Gemini cached content of this version of the tender, if any"""
+    entry = tender_cache.get(tender_id)
+    if entry and entry[2] == content_hash and entry[3] > time.time():
+        return entry[1]
+    return None
+
+def create_cached_tender(tender_id: str, content_hash: str, document_prompt: str) -> Optional[genai.GenerativeModel]:
+    """Upload the tender documents and system prompt to a Gemini cached content
+    Returns None when Gemini refuses the cache (e.g. the documents are below the
+    model's minimum cacheable token count) so the caller can send a full prompt.
+    A refusal is remembered for this version of the tender until the cache TTL has
+    passed, so later questions don't repeat the failing request.
+    """
+    refused = refused_tender_caches.get(tender_id)
+    if refused and refused[0] == content_hash and refused[1] > time.time():
+        return None
+    
     try:
-        print(f"[INFO] Calling Gemini API with prompt length: {len(prompt)} characters")
-        
-        # Create the model
-        model = genai.GenerativeModel(
-            model_name=GEMINI_MODEL,
-            generation_config={
-                "temperature": TEMPERATURE,
-                "max_output_tokens": MAX_TOKENS,
-            }
+        logger.info("Creating Gemini context cache for tender %s", tender_id)
+        cache = caching.CachedContent.create(
+            model=GEMINI_MODEL,
+            display_name=tender_id,
+            system_instruction=SYSTEM_PROMPT,
+            contents=[document_prompt],
+            ttl=timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS),
         )
+        model = genai.GenerativeModel.from_cached_content(
+            cached_content=cache,
+            generation_config=GENERATION_CONFIG,
+        )
+        tender_cache[tender_id] = (cache, model, content_hash, time.time() + CONTEXT_CACHE_TTL_SECONDS)
+        refused_tender_caches.pop(tender_id, None)
+        return model
+    except Exception as e:
+        logger.warning("Could not create Gemini context cache for tender %s: %s", tender_id, e)
+        refused_tender_caches[tender_id] = (content_hash, time.time() + CONTEXT_CACHE_TTL_SECONDS)
+        return None
+
+def refresh_cached_tender(tender_id: str):
+    """Extend the TTL of a tender's cached content and drop expired cache entries"""
+    now = time.time()
+    for expired_id in [key for key, (_, _, _, expiry) in tender_cache.items() if expiry <= now]:
+        tender_cache.pop(expired_id, None)
+
+    entry = tender_cache.get(tender_id)
+    if not entry:
+        return
+    try:
+        entry[0].update(ttl=timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS))
+        tender_cache[tender_id] = (entry[0], entry[1], entry[2], now + CONTEXT_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.warning("Could not refresh Gemini context cache for tender %s: %s", tender_id, e)
+        tender_cache.pop(tender_id, None)
+
+async def embed_question(question: str) -> Optional[np.ndarray]:
+    """Embed a question as a unit-length vector, or return None if embedding fails"""
+    try:
+        result = await genai.embed_content_async(model=EMBEDDING_MODEL, content=question)
+        vector = np.asarray(result["embedding"], dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+    except Exception as e:
+        logger.warning("Could not embed question for semantic cache: %s", e)
+        return None
+
+def lookup_semantic_cache(tender_id: str, content_hash: str, question_vector: np.ndarray) -> Optional[str]:
+    """Return the answer to an earlier, near-identical question about the same tender, if any"""
+    entry = semantic_cache.get(tender_id)
+    if not entry or entry[0] != content_hash:
+        return None
+    
+    # Embeddings are unit length, so one matrix-vector product gives every cosine similarity
+    similarities = entry[1] @ question_vector
+    best = int(np.argmax(similarities))
+    if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+        return None
+    logger.info("Semantic cache hit for tender %s (similarity %.3f)", tender_id, similarities[best])
+    return entry[2][best]
+
+def store_semantic_cache(tender_id: str, content_hash: str, question_vector: np.ndarray, answer: str):
+    """Remember an answer for later paraphrases of the question, keeping the newest entries"""
+    entry = semantic_cache.get(tender_id)
+    if entry and entry[0] == content_hash:
+        vectors = np.vstack([entry[1], question_vector])[-SEMANTIC_CACHE_MAX_ENTRIES:]
+        answers = (entry[2] + [answer])[-SEMANTIC_CACHE_MAX_ENTRIES:]
+    else:
+        vectors = question_vector[np.newaxis, :]
+        answers = [answer]
+    semantic_cache[tender_id] = (content_hash, vectors, answers)
+
+def create_gemini_model():
+    """Create the Gemini model used for uncached questions"""
+    return genai.GenerativeModel(
+        model_name=GEMINI_MODEL,
+        generation_config=GENERATION_CONFIG,
+        system_instruction=SYSTEM_PROMPT,
+    )
+
+def get_gemini_model(cached_model: Optional[genai.GenerativeModel] = None):
+    """Return the Gemini model for a question
+    When cached_model is given, the tender documents and system prompt are already
+    held by Gemini and only the question needs to be sent. Otherwise the model
+    created at startup is reused.
+    """
+    global gemini_model
+    if cached_model:
+        return cached_model
+    
+    if gemini_model is None:
+        gemini_model = create_gemini_model()
+    return gemini_model
+
+async def get_gemini_response(prompt: str, cached_model: Optional[genai.GenerativeModel] = None):
+    """Get response from Gemini API without blocking the event loop"""
+    try:
+        logger.info("Calling Gemini API with prompt length: %d characters", len(prompt))
         
-        # Combine system prompt and user prompt for models that don't support system_instruction
-        combined_prompt = f"{system_prompt}\n\n{prompt}"
-        
-        response = model.generate_content(combined_prompt)
+        model = get_gemini_model(cached_model)
+        response = await model.generate_content_async(prompt)
         
         if not response.text:
             raise Exception("Empty response from Gemini")
         
-        print(f"[INFO] Gemini response: {len(response.text)} characters")
+        logger.info("Gemini response: %d characters", len(response.text))
         return response.text
     except Exception as e:
-        print(f"[ERROR] Gemini API error: {str(e)}")
+        logger.error("Gemini API error: %s", e)
         raise Exception(f"Gemini API error: {str(e)}")
 
+async def stream_gemini_response(prompt: str, cached_model: Optional[genai.GenerativeModel] = None,
+                                 on_complete: Optional[Callable[[str], None]] = None):
+    """Yield the Gemini answer chunk by chunk as it is generated
+    on_complete receives the full answer once the stream has finished without errors.
+    """
+    try:
+        logger.info("Streaming Gemini API response for prompt length: %d characters", len(prompt))
+        
+        model = get_gemini_model(cached_model)
+        response = await model.generate_content_async(prompt, stream=True)
+        
+        chunks = []
+        async for chunk in response:
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+        
+        answer = "".join(chunks)
+        logger.info("Gemini streamed response: %d characters", len(answer))
+        if on_complete and answer:
+            on_complete(answer)
+    except Exception as e:
+        logger.exception("Gemini API error: %s", e)
+        # The response has already started, so report the failure in-band
+        yield "I'm sorry, I encountered an error while processing your question. Please try again later or with a more specific question."
+
 @app.get("/health")
-async def health_check():
-    """Health check endpoint for Docker and monitoring"""
+async def health_check(deep: bool = False):
+    """Health check endpoint for Docker and monitoring
+    With ?deep=true, also confirms the Gemini API key with a metadata-only call (no generation).
+    """
+    if deep:
+        try:
+            await asyncio.to_thread(lambda: next(iter(genai.list_models(page_size=1))))
+        except Exception as e:
+            logger.warning("Gemini API check failed: %s", e)
+            raise HTTPException(status_code=503, detail="Gemini API is unreachable or the API key is invalid")
     return {"status": "healthy", "message": "Tender Information Extraction API is running"}
 
 @app.get("/")
@@ -282,76 +623,297 @@ async def root():
         "endpoints": {
             "health": "/health",
             "ask": "/ask (POST)",
+            "ask_stream": "/ask/stream (POST)",
+            "ask_batch": "/ask/batch (POST, requires ENABLE_BATCH=true)",
             "docs": "/docs"
         }
     }
 
+async def load_tender_document(tender_id: str) -> Tuple[Optional[str], str, str]:
+    """
+    Look up and combine a tender's documents
+    Returns (fallback_answer, content_hash, document_prompt); fallback_answer is set when
+    the tender has nothing for Gemini to read.
+    """
+    # Find the tender
+    logger.debug("Looking up tender with ID: %s", tender_id)
+    # Run the blocking pymongo lookup in a worker thread so the event loop stays free
+    tender = await asyncio.to_thread(get_tender_by_id, tender_id)
+    if not tender:
+        logger.error("Tender not found with ID: %s", tender_id)
+        return f"No tender found with ID: {tender_id}. Please check the tender ID and try again.", "", ""
+    
+    logger.debug("Found tender. Keys: %s", tender.keys())
+    
+    # Extract file_texts
+    file_texts = tender.get("file_texts", {})
+    if not file_texts:
+        logger.error("No file texts found in tender document")
+        return "No file texts found for this tender. The document may be empty or not properly processed.", "", ""
+    
+    if isinstance(file_texts, dict):
+        logger.info("File texts contains %d files", len(file_texts))
+        logger.debug("File names: %s", file_texts.keys())
+    else:
+        logger.info("File texts is of type %s", type(file_texts))
+    
+    # Combine all file texts, skipping the work if it was done at ingestion or for an earlier question
+    content_hash = hash_file_texts(file_texts)
+    precombined = tender.get(COMBINED_TEXT_FIELD) or {}
+    if precombined.get("content_hash") == content_hash:
+        logger.info("Using precombined text stored with the tender")
+        combined_text = precombined["text"]
+    else:
+        logger.info("Combining file texts...")
+        combined_text = await get_combined_text(tender_id, file_texts, content_hash)
+    logger.info("Combined text length: %d characters", len(combined_text))
+    
+    # Don't pay for a Gemini call on a degenerate tender, or for bytes beyond the prompt cap
+    if len(combined_text.strip()) < MIN_DOCUMENT_CHARS:
+        logger.warning("Combined text for tender %s is only %d characters", tender_id, len(combined_text))
+        return "Tender document appears empty.", "", ""
+    if len(combined_text) > MAX_PROMPT_CHARS:
+        logger.warning("Truncating combined text for tender %s from %d to %d characters",
+                       tender_id, len(combined_text), MAX_PROMPT_CHARS)
+        combined_text = combined_text[:MAX_PROMPT_CHARS]
+    
+    return None, content_hash, f"Here is the tender document with ID {tender_id}:\n\n{combined_text}"
+
+async def prepare_question(request: TenderRequest, background_tasks: BackgroundTasks) -> Tuple[Optional[str], str, Optional[genai.GenerativeModel], Optional[Callable[[str], None]]]:
+    """
+    Look up and combine a tender's documents for a question
+    Returns (fallback_answer, user_prompt, cached_model, remember_answer); fallback_answer
+    is set when the question can be answered without calling Gemini, and remember_answer,
+    when set, should be called with Gemini's answer so paraphrases can reuse it.
+    """
+    logger.info("Received request for tender_id: %s", request.tender_id)
+    logger.info("Question: %s", request.question)
+    
+    # Validate input
+    if not request.tender_id:
+        logger.error("Tender ID is missing")
+        raise HTTPException(status_code=400, detail="Tender ID is required")
+    if not request.question:
+        logger.error("Question is missing")
+        raise HTTPException(status_code=400, detail="Question is required")
+    
+    fallback_answer, content_hash, document_prompt = await load_tender_document(request.tender_id)
+    if fallback_answer:
+        return fallback_answer, "", None, None
+    
+    # Answer paraphrases of earlier questions about this tender without calling Gemini
+    remember_answer = None
+    if ENABLE_SEMANTIC_CACHE:
+        question_vector = await embed_question(request.question)
+        if question_vector is not None:
+            cached_answer = lookup_semantic_cache(request.tender_id, content_hash, question_vector)
+            if cached_answer:
+                return cached_answer, "", None, None
+            remember_answer = partial(store_semantic_cache, request.tender_id, content_hash, question_vector)
+    
+    # Reuse the tender's Gemini context cache so the documents aren't re-sent with every question
+    cached_model = None
+    if ENABLE_CONTEXT_CACHE:
+        cached_model = get_cached_tender(request.tender_id, content_hash)
+        if cached_model:
+            logger.info("Using Gemini context cache: %s", cached_model.cached_content)
+            background_tasks.add_task(refresh_cached_tender, request.tender_id)
+        else:
+            cached_model = await asyncio.to_thread(create_cached_tender, request.tender_id, content_hash, document_prompt)
+    
+    # Create the user prompt
+    if cached_model:
+        user_prompt = f"Question: {request.question}"
+    else:
+        user_prompt = f"{document_prompt}\n\nQuestion: {request.question}"
+    logger.debug("User prompt length: %d characters", len(user_prompt))
+    
+    return None, user_prompt, cached_model, remember_answer
+
 @app.post("/ask", response_model=TenderResponse)
-async def ask_question(request: TenderRequest):
+async def ask_question(request: TenderRequest, background_tasks: BackgroundTasks):
     """
     Endpoint to ask questions about tender documents
     """
-    import time
     try:
-        print(f"\n[INFO] Received request for tender_id: {request.tender_id}")
-        print(f"[INFO] Question: {request.question}")
-        
-        # Validate input
-        if not request.tender_id:
-            print("[ERROR] Tender ID is missing")
-            raise HTTPException(status_code=400, detail="Tender ID is required")
-        if not request.question:
-            print("[ERROR] Question is missing")
-            raise HTTPException(status_code=400, detail="Question is required")
-        
-        # Find the tender
-        print(f"[INFO] Looking up tender with ID: {request.tender_id}")
-        tender = get_tender_by_id(request.tender_id)
-        if not tender:
-            print(f"[ERROR] Tender not found with ID: {request.tender_id}")
-            return TenderResponse(answer=f"No tender found with ID: {request.tender_id}. Please check the tender ID and try again.")
-        
-        print(f"[INFO] Found tender. Keys: {list(tender.keys())}")
-        
-        # Extract file_texts
-        file_texts = tender.get("file_texts", {})
-        if not file_texts:
-            print("[ERROR] No file texts found in tender document")
-            return TenderResponse(answer="No file texts found for this tender. The document may be empty or not properly processed.")
-        
-        if isinstance(file_texts, dict):
-            print(f"[INFO] File texts contains {len(file_texts)} files")
-            print(f"[INFO] File names: {list(file_texts.keys())}")
-        else:
-            print(f"[INFO] File texts is of type {type(file_texts)}")
-        
-        # Combine all file texts
-        print("[INFO] Combining file texts...")
-        combined_text = combine_file_texts(file_texts)
-        print(f"[INFO] Combined text length: {len(combined_text)} characters")
-        
-        # Use the system prompt from config.py
-        system_prompt = SYSTEM_PROMPT
-        
-        # Create the user prompt
-        user_prompt = f"Here is the tender document with ID {request.tender_id}:\n\n{combined_text}\n\nQuestion: {request.question}"
-        print(f"[INFO] User prompt length: {len(user_prompt)} characters")
+        fallback_answer, user_prompt, cached_model, remember_answer = await prepare_question(request, background_tasks)
+        if fallback_answer:
+            return TenderResponse(answer=fallback_answer)
         
         # Get response from Gemini
         try:
-            print("[INFO] Calling Gemini API...")
-            answer = get_gemini_response(user_prompt, system_prompt)
-            print("[INFO] Received response from Gemini")
+            logger.info("Calling Gemini API...")
+            answer = await get_gemini_response(user_prompt, cached_model)
+            logger.info("Received response from Gemini")
+            if remember_answer:
+                remember_answer(answer)
             return TenderResponse(answer=answer)
         except Exception as e:
-            print(f"[ERROR] Gemini API error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Gemini API error: %s", e)
             # Return a fallback response instead of raising an exception
             return TenderResponse(answer="I'm sorry, I encountered an error while processing your question. Please try again later or with a more specific question.")
     except Exception as e:
-        print(f"[ERROR] Unhandled exception: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unhandled exception: %s", e)
         # Return a fallback response instead of raising an exception
         return TenderResponse(answer="I'm sorry, I encountered an unexpected error while processing your request. Please try again later.")
+
+@app.post("/ask/stream")
+async def ask_question_stream(request: TenderRequest, background_tasks: BackgroundTasks):
+    """
+    Endpoint to ask questions about tender documents, streaming the answer as plain text
+    """
+    remember_answer = None
+    try:
+        fallback_answer, user_prompt, cached_model, remember_answer = await prepare_question(request, background_tasks)
+    except Exception as e:
+        logger.exception("Unhandled exception: %s", e)
+        fallback_answer = "I'm sorry, I encountered an unexpected error while processing your request. Please try again later."
+    
+    if fallback_answer:
+        return StreamingResponse(iter([fallback_answer]), media_type="text/plain")
+    
+    logger.info("Streaming Gemini API response...")
+    return StreamingResponse(
+        stream_gemini_response(user_prompt, cached_model, remember_answer),
+        media_type="text/plain",
+    )
+
+
+def build_batch_request(prompt: str, key: str) -> Dict[str, Any]:
+    """Build one inline GenerateContent request for the Gemini Batch API"""
+    return {
+        "request": {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "systemInstruction": {"parts": [{"text": SYSTEM_PROMPT}]},
+            "generationConfig": {
+                "temperature": TEMPERATURE,
+                "maxOutputTokens": MAX_TOKENS,
+            },
+        },
+        "metadata": {"key": key},
+    }
+
+def extract_batch_answer(inlined_response: Dict[str, Any]) -> str:
+    """Pull the answer text out of one inlined Batch API response"""
+    if inlined_response.get("error"):
+        logger.error("Gemini batch request failed: %s", inlined_response["error"])
+        return "I'm sorry, I encountered an error while processing your question. Please try again later or with a more specific question."
+    
+    candidates = inlined_response.get("response", {}).get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+@app.post("/ask/batch", response_model=BatchResponse)
+async def ask_questions_batch(requests: List[TenderRequest]):
+    """
+    Endpoint to submit many tender questions as one Gemini batch job
+    Batch jobs are billed at a discount but complete asynchronously; poll
+    /ask/batch/{batch_id} for the answers.
+    """
+    if not ENABLE_BATCH:
+        raise HTTPException(status_code=404, detail="Batch mode is disabled")
+    if not requests:
+        raise HTTPException(status_code=400, detail="At least one question is required")
+    if len(requests) > BATCH_MAX_QUESTIONS:
+        # Every question carries its tender's whole document, so the count bounds the payload
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+    
+    logger.info("Received batch of %d questions", len(requests))
+    
+    # Questions that can be answered without Gemini keep their slot in the result list
+    fallback_answers: Dict[int, str] = {}
+    batch_requests = []
+    for index, request in enumerate(requests):
+        if not request.tender_id or not request.question:
+            fallback_answers[index] = "Tender ID and question are required."
+            continue
+        fallback_answer, _, document_prompt = await load_tender_document(request.tender_id)
+        if fallback_answer:
+            fallback_answers[index] = fallback_answer
+            continue
+        batch_requests.append(build_batch_request(f"{document_prompt}\n\nQuestion: {request.question}", str(index)))
+    
+    batch_id = ""
+    if batch_requests:
+        body = json.dumps({
+            "batch": {
+                "display_name": f"tender-questions-{int(time.time())}",
+                "input_config": {"requests": {"requests": batch_requests}},
+            }
+        }).encode("utf-8")
+        if len(body) > BATCH_MAX_PAYLOAD_BYTES:
+            logger.warning("Batch payload of %d bytes exceeds the %d byte limit", len(body), BATCH_MAX_PAYLOAD_BYTES)
+            raise HTTPException(status_code=413, detail="Batch is too large; submit fewer questions per batch")
+        
+        async with httpx.AsyncClient(timeout=GEMINI_BATCH_TIMEOUT_SECONDS) as client:
+            response = await client.post(
+                f"{GEMINI_API_BASE_URL}/models/{GEMINI_MODEL}:batchGenerateContent",
+                headers={"x-goog-api-key": GEMINI_API_KEY, "Content-Type": "application/json"},
+                content=body,
+            )
+        if response.is_error:
+            logger.error("Gemini batch submission failed: %s", response.text)
+            raise HTTPException(status_code=502, detail="Could not submit batch to Gemini")
+        batch_id = response.json()["name"].split("/")[-1]
+        logger.info("Submitted Gemini batch %s with %d requests", batch_id, len(batch_requests))
+    else:
+        # Nothing to send to Gemini; every answer is already known
+        batch_id = f"local-{int(time.time() * 1000)}"
+    
+    if len(batch_jobs) >= BATCH_JOBS_MAX_ENTRIES:
+        # Forget the oldest batch; its Gemini answers can still be fetched, only the local ones are lost
+        batch_jobs.pop(next(iter(batch_jobs)))
+    batch_jobs[batch_id] = (len(requests), fallback_answers)
+    return BatchResponse(batch_id=batch_id)
+
+@app.get("/ask/batch/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_answers(batch_id: str):
+    """
+    Endpoint to poll a Gemini batch job and collect its answers once it has finished
+    """
+    if not ENABLE_BATCH:
+        raise HTTPException(status_code=404, detail="Batch mode is disabled")
+    
+    total, fallback_answers = batch_jobs.get(batch_id, (0, {}))
+    if batch_id.startswith("local-"):
+        if batch_id not in batch_jobs:
+            raise HTTPException(status_code=404, detail="Unknown batch")
+        batch_jobs.pop(batch_id)
+        return BatchStatusResponse(
+            batch_id=batch_id,
+            state="SUCCEEDED",
+            answers=[fallback_answers[index] for index in range(total)],
+        )
+    
+    async with httpx.AsyncClient(timeout=GEMINI_BATCH_TIMEOUT_SECONDS) as client:
+        response = await client.get(
+            f"{GEMINI_API_BASE_URL}/batches/{batch_id}",
+            headers={"x-goog-api-key": GEMINI_API_KEY},
+        )
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail="Unknown batch")
+    if response.is_error:
+        logger.error("Gemini batch lookup failed: %s", response.text)
+        raise HTTPException(status_code=502, detail="Could not fetch batch from Gemini")
+    
+    batch = response.json()
+    state = batch.get("metadata", {}).get("state", "UNKNOWN")
+    if not state.endswith("SUCCEEDED"):
+        return BatchStatusResponse(batch_id=batch_id, state=state)
+    
+    inlined = batch.get("response", {}).get("inlinedResponses", {})
+    if isinstance(inlined, dict):
+        inlined = inlined.get("inlinedResponses", [])
+    gemini_answers = {
+        int(item.get("metadata", {}).get("key", -1)): extract_batch_answer(item)
+        for item in inlined
+    }
+    
+    # Restore request order; the answer count is unknown if the batch was submitted by another worker
+    total = total or (max(gemini_answers, default=-1) + 1)
+    answers = [
+        fallback_answers.get(index) or gemini_answers.get(index, "")
+        for index in range(total)
+    ]
+    batch_jobs.pop(batch_id, None)
+    return BatchStatusResponse(batch_id=batch_id, state=state, answers=answers)
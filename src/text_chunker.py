@@ -5,15 +5,22 @@ related to specific qualification criteria and important clauses.
 """
 
 import re
+from bisect import bisect_left, bisect_right
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from functools import partial
+from itertools import chain
 from typing import Dict, List, Tuple, Any, Optional, Set
 import json
 from datetime import datetime
-from functools import lru_cache
+
+import ahocorasick
+import numpy as np
 
 # Import context size from config
 from config import CONTEXT_SIZE
 
-# Define key terms for different categories - using frozensets for O(1) lookup
+# Define key terms for different categories - matched in one pass via CATEGORY_AUTOMATON
 CRITERIA_KEYWORDS = {
     "technical": frozenset([
         "technical qualification", "technical criteria", "technical requirement", 
@@ -38,21 +45,104 @@ CRITERIA_KEYWORDS = {
     ])
 }
 
+# Define search terms for each specific criteria; term order sets the order of extracted sections
+CRITERIA_SEARCH_TERMS = {
+    "turnover": ("turnover", "annual turnover", "average annual turnover", "financial turnover", "revenue"),
+    "emd_submission": ("earnest money deposit", "emd", "bid security", "mode of emd", "emd submission"),
+    "completion_period": ("completion period", "contract period", "time of completion", "project timeline"),
+    "performance_security": ("performance security", "performance guarantee", "performance bond"),
+    "security_deposit": ("security deposit", "retention money", "retention amount", "withheld amount"),
+    "defect_liability": ("defect liability", "defect liability period", "maintenance period", "warranty period"),
+    "mobilization_advance": ("mobilization advance", "mobilisation advance", "advance payment"),
+    "solvency_working_capital": ("solvency", "working capital", "bank solvency", "credit facility"),
+    "liquid_asset": ("liquid asset", "cash flow", "liquidity", "liquid fund"),
+    "price_variation": ("price variation", "price adjustment", "escalation clause", "price escalation"),
+    "incentive_bonus": ("incentive", "bonus clause", "early completion bonus", "performance bonus")
+}
+
+# Texts are lowercased before matching, so every term must be lowercase already
+assert all(term == term.lower() for terms in CRITERIA_KEYWORDS.values() for term in terms)
+assert all(term == term.lower() for terms in CRITERIA_SEARCH_TERMS.values() for term in terms)
+
+@dataclass(slots=True)
+class Chunk:
+    """A paragraph of a tender file and the criteria categories it belongs to."""
+    text: str
+    paragraph_index: int
+    source: str
+    categories: Tuple[str, ...]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+@dataclass(slots=True)
+class CriteriaSection:
+    """A section of a tender file around a specific criteria search term."""
+    text: str
+    source: str
+    keyword: str
+    criteria_type: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
 # Compile regex patterns once for better performance
-SENTENCE_BOUNDARIES = re.compile(r'(?:\. |\.\n|\n\n)')
+# Matches the first character of ". ", ".\n" or "\n\n" only, so that overlapping
+# boundaries (e.g. ".\n\n") are all reported; leading with a literal lets the
+# engine skip ahead to candidate characters
+SENTENCE_BOUNDARIES = re.compile(r'\.(?=[ \n])|\n(?=\n)')
+# Blank lines may hold whitespace; the engine jumps between newlines, so this
+# runs as fast as a plain str.split("\n\n") and needs no fallback path
 PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
 
-@lru_cache(maxsize=128)
-def _cached_keyword_search(text_lower: str, keyword: str) -> bool:
-    """Cache keyword searches for repeated patterns."""
-    return keyword in text_lower
+def _build_automaton(terms_by_tag: Dict[Any, Any]) -> "ahocorasick.Automaton":
+    """Build an Aho-Corasick automaton mapping each term to (term, tags it is listed under)."""
+    tags_by_term: Dict[str, Tuple[Any, ...]] = {}
+    for tag, terms in terms_by_tag.items():
+        for term in terms:
+            tags_by_term[term] = tags_by_term.get(term, ()) + (tag,)
+    
+    automaton = ahocorasick.Automaton()
+    for term, tags in tags_by_term.items():
+        automaton.add_word(term, (term, tags))
+    automaton.make_automaton()
+    return automaton
+
+# Category keywords alone, so a single section is scanned in one pass
+CATEGORY_AUTOMATON = _build_automaton(CRITERIA_KEYWORDS)
 
-def identify_section_type(text: str) -> List[str]:
+# One bit per category, so a paragraph's categories fit in an integer mask
+CATEGORY_BITS = {category: 1 << i for i, category in enumerate(CRITERIA_KEYWORDS)}
+# Categories in declared order for every possible mask
+CATEGORY_COMBINATIONS = tuple(
+    tuple(category for category, bit in CATEGORY_BITS.items() if mask & bit)
+    for mask in range(1 << len(CATEGORY_BITS))
+)
+
+def _build_document_automaton() -> "ahocorasick.Automaton":
+    """Build an automaton over both keyword families, mapping each term to (term, category mask, is criteria term)."""
+    masks: Dict[str, int] = {}
+    for category, keywords in CRITERIA_KEYWORDS.items():
+        for keyword in keywords:
+            masks[keyword] = masks.get(keyword, 0) | CATEGORY_BITS[category]
+    criteria_terms = {term for terms in CRITERIA_SEARCH_TERMS.values() for term in terms}
+    
+    automaton = ahocorasick.Automaton()
+    for term in masks.keys() | criteria_terms:
+        automaton.add_word(term, (term, masks.get(term, 0), term in criteria_terms))
+    automaton.make_automaton()
+    return automaton
+
+# Both keyword families, so a whole file is scanned once for chunking and criteria extraction
+DOCUMENT_AUTOMATON = _build_document_automaton()
+
+def identify_section_type(text: str, text_lower: Optional[str] = None) -> List[str]:
     """
     Optimized function to identify which criteria categories a text section belongs to.
     
     Args:
         text: The text section to analyze
+        text_lower: Pre-lowercased text, to avoid lowercasing it again
         
     Returns:
         List of category names that match this section
@@ -60,23 +150,36 @@ def identify_section_type(text: str) -> List[str]:
     if not text or len(text.strip()) < 10:
         return []
     
-    text_lower = text.lower()
-    matched_categories = []
+    if text_lower is None:
+        text_lower = text.lower()
+    found = set()
     
-    # Use set operations for faster matching
-    for category, keywords in CRITERIA_KEYWORDS.items():
-        # Check if any keyword is found in text - early exit on first match
-        if any(_cached_keyword_search(text_lower, keyword) for keyword in keywords):
-            matched_categories.append(category)
-                
-    return matched_categories
+    for _, (_, categories) in CATEGORY_AUTOMATON.iter(text_lower):
+        found.update(categories)
+        if len(found) == len(CRITERIA_KEYWORDS):
+            break
+    
+    # Keep the categories in their declared order
+    return [category for category in CRITERIA_KEYWORDS if category in found]
 
-def _find_sentence_boundaries(text: str, pos: int, direction: str = 'forward') -> int:
+def _sentence_boundary_index(text: str) -> List[int]:
     """
-    Helper function to find sentence boundaries efficiently.
+    Build a sorted index of sentence boundary offsets for a text.
     
     Args:
         text: The full text
+        
+    Returns:
+        Start offsets of every two-character sentence boundary, in ascending order
+    """
+    return [m.start() for m in SENTENCE_BOUNDARIES.finditer(text)]
+
+def _find_sentence_boundaries(boundaries: List[int], pos: int, direction: str = 'forward') -> int:
+    """
+    Helper function to find sentence boundaries efficiently.
+    
+    Args:
+        boundaries: Sentence boundary index from _sentence_boundary_index
         pos: Current position
         direction: 'forward' or 'backward'
         
@@ -84,26 +187,15 @@ def _find_sentence_boundaries(text: str, pos: int, direction: str = 'forward') -
         Position of sentence boundary
     """
     if direction == 'backward' and pos > 0:
-        # Find previous sentence boundary
-        boundaries = [
-            text.rfind(". ", 0, pos),
-            text.rfind(".\n", 0, pos),
-            text.rfind("\n\n", 0, pos)
-        ]
-        boundary = max(b for b in boundaries if b != -1)
-        return boundary + 2 if boundary != -1 else 0
-    
-    elif direction == 'forward' and pos < len(text):
-        # Find next sentence boundary
-        boundaries = [
-            text.find(". ", pos),
-            text.find(".\n", pos),
-            text.find("\n\n", pos)
-        ]
-        valid_boundaries = [b for b in boundaries if b != -1]
-        if valid_boundaries:
-            boundary = min(valid_boundaries)
-            return boundary + 1
+        # Last boundary lying entirely before pos
+        i = bisect_right(boundaries, pos - 2) - 1
+        return boundaries[i] + 2 if i >= 0 else 0
+    
+    elif direction == 'forward':
+        # First boundary starting at or after pos
+        i = bisect_left(boundaries, pos)
+        if i < len(boundaries):
+            return boundaries[i] + 1
     
     return pos
 
@@ -129,51 +221,197 @@ def extract_section_with_context(text: str, keyword: str, context_size: int = CO
     if keyword_pos == -1:
         return ""
     
+    return extract_section_at(text, keyword_pos, len(keyword), context_size)
+
+def extract_section_at(text: str, keyword_pos: int, keyword_len: int, context_size: int = CONTEXT_SIZE,
+                       boundaries: Optional[List[int]] = None) -> str:
+    """
+    Extract a section of text around a keyword whose position is already known.
+    
+    Args:
+        text: The full text the keyword was found in
+        keyword_pos: Offset of the keyword in the text
+        keyword_len: Length of the keyword
+        context_size: Number of characters to include before and after the keyword
+        boundaries: Sentence boundary index of the text, built if not given
+        
+    Returns:
+        Text section with the keyword and its context
+    """
+    if boundaries is None:
+        boundaries = _sentence_boundary_index(text)
+    
     # Calculate initial boundaries
     start_pos = max(0, keyword_pos - context_size)
-    end_pos = min(len(text), keyword_pos + len(keyword) + context_size)
+    end_pos = min(len(text), keyword_pos + keyword_len + context_size)
     
     # Expand to complete sentences for better readability
-    start_pos = _find_sentence_boundaries(text, start_pos, 'backward')
-    end_pos = _find_sentence_boundaries(text, end_pos, 'forward')
+    start_pos = _find_sentence_boundaries(boundaries, start_pos, 'backward')
+    end_pos = _find_sentence_boundaries(boundaries, end_pos, 'forward')
     
     return text[start_pos:end_pos].strip()
 
-def _process_paragraph_chunk(paragraph: str, prev_para: str, next_para: str, filename: str) -> Optional[Dict[str, Any]]:
+def get_context(chunk: Chunk, file_texts: Dict[str, str], paragraph_spans: Dict[str, List[Tuple[int, int]]]) -> str:
+    """
+    Build the context of a chunk on demand: its paragraph with the previous and next ones.
+    
+    Args:
+        chunk: Chunk from chunk_tender_documents
+        file_texts: The file texts the chunks were built from
+        paragraph_spans: The "paragraph_spans" table of the same result
+        
+    Returns:
+        The source text from the start of the previous paragraph to the end of the next one
+    """
+    spans = paragraph_spans[chunk.source]
+    i = chunk.paragraph_index
+    return file_texts[chunk.source][spans[max(0, i - 1)][0]:spans[min(len(spans) - 1, i + 1)][1]]
+
+def _paragraph_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Locate the paragraphs of a text by offset.
+    
+    Args:
+        text: The full text
+        
+    Returns:
+        (start, end) offsets of each non-blank paragraph, surrounding whitespace excluded
+    """
+    spans = []
+    pos = 0
+    
+    for separator in chain(PARAGRAPH_SPLIT.finditer(text), (None,)):
+        end = separator.start() if separator else len(text)
+        stripped = text[pos:end].lstrip()
+        if stripped:
+            start = end - len(stripped)
+            spans.append((start, start + len(stripped.rstrip())))
+        if separator:
+            pos = separator.end()
+    
+    return spans
+
+def _bucket_hits(spans: List[Tuple[int, int]], hit_starts: List[int], hit_ends: List[int],
+                 hit_masks: List[int]) -> List[int]:
+    """
+    Combine the category masks of the keyword hits lying inside each paragraph.
+    
+    Args:
+        spans: (start, end) offsets of the paragraphs, in ascending order
+        hit_starts: Offset of the first character of each hit
+        hit_ends: Offset of the last character of each hit
+        hit_masks: Category mask of each hit
+        
+    Returns:
+        Category mask of each paragraph
+    """
+    if not hit_starts:
+        return [0] * len(spans)
+    
+    bounds = np.array(spans, dtype=np.int64)
+    starts = np.array(hit_starts, dtype=np.int64)
+    ends = np.array(hit_ends, dtype=np.int64)
+    
+    # Paragraph each hit starts in, kept only if the hit also ends inside it
+    paragraph = np.searchsorted(bounds[:, 0], starts, side="right") - 1
+    inside = (paragraph >= 0) & (ends < bounds[np.maximum(paragraph, 0), 1])
+    
+    masks = np.zeros(len(spans), dtype=np.int64)
+    np.bitwise_or.at(masks, paragraph[inside], np.array(hit_masks, dtype=np.int64)[inside])
+    return masks.tolist()
+
+def _process_file(filename: str, content: str, content_lower: Optional[str],
+                  chunk_paragraphs: bool = True, extract_sections: bool = True
+                  ) -> Tuple[List[Chunk], Dict[str, str], List[Tuple[int, int]]]:
     """
-    Helper function to process individual paragraph chunks.
+    Helper function to chunk one file and extract its criteria sections from a single scan.
     
     Args:
-        paragraph: Current paragraph
-        prev_para: Previous paragraph for context
-        next_para: Next paragraph for context
         filename: Source filename
+        content: Text content of the file
+        content_lower: Lowercased content, computed if not given
+        chunk_paragraphs: Whether to split the file into paragraph chunks
+        extract_sections: Whether to extract criteria sections
         
     Returns:
-        Chunk info dictionary or None if paragraph is too short
+        Tuple of the chunks in paragraph order, the sections around
+        the first occurrence of each criteria search term keyed by term, and the
+        (start, end) offsets of the file's paragraphs
     """
-    if len(paragraph.strip()) < 50:
-        return None
+    if content_lower is None:
+        # str.lower already has a fast path for ASCII-only text, which beats
+        # encoding to bytes, and the automaton only matches str anyway
+        content_lower = content.lower()
+    
+    spans = _paragraph_spans(content) if chunk_paragraphs else []
+    # Lowercasing never shrinks text, so equal lengths mean the offsets line up
+    lower_spans = [] if not chunk_paragraphs else (
+        spans if len(content_lower) == len(content) else _paragraph_spans(content_lower)
+    )
+    
+    hit_starts: List[int] = []
+    hit_ends: List[int] = []
+    hit_masks: List[int] = []
+    term_positions: Dict[str, int] = {}
+    
+    # One automaton pass collects category hits and finds every criteria term
+    for end, (term, mask, is_criteria_term) in DOCUMENT_AUTOMATON.iter(content_lower):
+        start = end - len(term) + 1
+        if is_criteria_term:
+            term_positions.setdefault(term, start)
+        if mask and lower_spans:
+            hit_starts.append(start)
+            hit_ends.append(end)
+            hit_masks.append(mask)
+    
+    paragraph_masks = _bucket_hits(lower_spans, hit_starts, hit_ends, hit_masks)
+    
+    chunks = []
+    
+    # Short paragraphs are not chunked, or even sliced out; they remain in the
+    # spans as their neighbours' context
+    for i, (start, end) in enumerate(spans):
+        if end - start < 50:
+            continue
+        
+        # Spans exclude surrounding whitespace, so the paragraphs come out stripped
+        chunks.append(Chunk(content[start:end], i, filename, CATEGORY_COMBINATIONS[paragraph_masks[i]]))
     
-    # Build context efficiently
-    context_parts = [prev_para, paragraph, next_para]
-    context = "\n\n".join(part for part in context_parts if part)
+    sections = {}
     
-    categories = identify_section_type(paragraph)
+    if extract_sections and term_positions:
+        boundaries = _sentence_boundary_index(content)
+        for term, term_pos in term_positions.items():
+            extracted_text = extract_section_at(content, term_pos, len(term), boundaries=boundaries)
+            if extracted_text and len(extracted_text.strip()) > 20:
+                sections[term] = extracted_text
     
-    return {
-        "text": paragraph.strip(),
-        "context": context,
-        "source": filename,
-        "categories": categories
-    }
+    return chunks, sections, spans
 
-def chunk_by_criteria(file_texts: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+def _map_files(executor: Optional[Executor], func, *iterables) -> List[Any]:
     """
-    Optimized function to process file texts and chunk them by different criteria categories.
+    Apply a per-file function, fanning out over the executor when there is more than one file.
     
     Args:
-        file_texts: Dictionary mapping file names to their text content
+        executor: Executor to run the calls on, or None to run them in-process. Use a
+            process pool: the automaton iterator and the regex scans hold the GIL,
+            so threads would run the files one at a time
+        func: Picklable function taking one item from each iterable
+        *iterables: Per-file argument lists of equal length
+        
+    Returns:
+        List of results in input order
+    """
+    if executor is not None and len(iterables[0]) > 1:
+        return list(executor.map(func, *iterables))
+    return list(map(func, *iterables))
+
+def _categorize_chunks(file_chunks) -> Dict[str, List[Chunk]]:
+    """
+    Helper function to distribute chunks to the categories they belong to.
+    
+    Args:
+        file_chunks: Iterable of per-file chunk lists, in file order
         
     Returns:
         Dictionary with criteria categories as keys and lists of relevant text chunks as values
@@ -182,43 +420,52 @@ def chunk_by_criteria(file_texts: Dict[str, str]) -> Dict[str, List[Dict[str, An
     chunks_by_category = {category: [] for category in CRITERIA_KEYWORDS.keys()}
     chunks_by_category["other"] = []
     
-    for filename, content in file_texts.items():
-        if not content or len(content.strip()) < 100:
-            continue
-            
-        # Split content into paragraphs using compiled regex
-        paragraphs = [p.strip() for p in PARAGRAPH_SPLIT.split(content) if p.strip()]
-        
-        # Process paragraphs with context
-        for i, paragraph in enumerate(paragraphs):
-            prev_para = paragraphs[i-1] if i > 0 else ""
-            next_para = paragraphs[i+1] if i < len(paragraphs) - 1 else ""
-            
-            chunk_info = _process_paragraph_chunk(paragraph, prev_para, next_para, filename)
-            if not chunk_info:
-                continue
-            
+    for chunks in file_chunks:
+        for chunk in chunks:
             # Distribute chunk to appropriate categories
-            if not chunk_info["categories"]:
-                chunks_by_category["other"].append(chunk_info)
+            if not chunk.categories:
+                chunks_by_category["other"].append(chunk)
             else:
-                for category in chunk_info["categories"]:
+                for category in chunk.categories:
                     if category in chunks_by_category:
-                        chunks_by_category[category].append(chunk_info)
+                        chunks_by_category[category].append(chunk)
     
     # Remove empty categories to reduce memory usage
     return {k: v for k, v in chunks_by_category.items() if v}
 
-def _extract_criteria_sections(combined_text: str, file_texts: Dict[str, str], 
-                             criteria_type: str, search_terms: List[str]) -> List[Dict[str, str]]:
+def chunk_by_criteria(file_texts: Dict[str, str],
+                      file_texts_lower: Optional[Dict[str, str]] = None,
+                      executor: Optional[Executor] = None) -> Dict[str, List[Chunk]]:
+    """
+    Optimized function to process file texts and chunk them by different criteria categories.
+    chunk_tender_documents does this and the criteria extraction in one pass per file, and
+    also returns the paragraph offsets get_context needs.
+    
+    Args:
+        file_texts: Dictionary mapping file names to their text content
+        file_texts_lower: Same mapping with lowercased content, computed if not given
+        executor: Optional executor used to chunk files in parallel
+        
+    Returns:
+        Dictionary with criteria categories as keys and lists of relevant text chunks as values
+    """
+    filenames = [k for k, v in file_texts.items() if v and len(v.strip()) >= 100]
+    contents = [file_texts[k] for k in filenames]
+    contents_lower = [file_texts_lower[k] if file_texts_lower else None for k in filenames]
+    
+    results = _map_files(executor, partial(_process_file, extract_sections=False),
+                         filenames, contents, contents_lower)
+    return _categorize_chunks(chunks for chunks, _, _ in results)
+
+def _extract_criteria_sections(file_sections: Dict[str, Dict[str, str]],
+                             criteria_type: str, search_terms: Tuple[str, ...]) -> List[CriteriaSection]:
     """
     Helper function to extract sections for specific criteria.
     
     Args:
-        combined_text: Combined text from all files
-        file_texts: Original file texts
+        file_sections: Per-file sections keyed by search term, from _process_file
         criteria_type: Type of criteria being extracted
-        search_terms: List of terms to search for
+        search_terms: Lowercase terms to search for
         
     Returns:
         List of extracted sections with metadata
@@ -227,41 +474,60 @@ def _extract_criteria_sections(combined_text: str, file_texts: Dict[str, str],
     processed_terms = set()  # Avoid duplicate processing
     
     for term in search_terms:
-        term_lower = term.lower()
-        if term_lower in processed_terms:
+        if term in processed_terms:
             continue
-        processed_terms.add(term_lower)
+        processed_terms.add(term)
         
-        for filename, content in file_texts.items():
-            if term_lower in content.lower():
-                extracted_text = extract_section_with_context(content, term)
-                if extracted_text and len(extracted_text.strip()) > 20:
-                    sections.append({
-                        "text": extracted_text,
-                        "source": filename,
-                        "keyword": term,
-                        "criteria_type": criteria_type
-                    })
+        for filename, extracted in file_sections.items():
+            extracted_text = extracted.get(term)
+            if extracted_text:
+                sections.append(CriteriaSection(extracted_text, filename, term, criteria_type))
     
     # Remove duplicate sections based on text similarity
     unique_sections = []
     seen_texts = set()
     
     for section in sections:
-        # Use first 100 characters as uniqueness key
-        text_key = section["text"][:100].lower().strip()
+        # Sections start on a sentence boundary, so nearby hits share their first
+        # 100 characters; the raw slice is key enough, no lowered copy needed
+        text_key = section.text[:100]
         if text_key not in seen_texts:
             seen_texts.add(text_key)
             unique_sections.append(section)
     
     return unique_sections
 
-def extract_specific_criteria(file_texts: Dict[str, str]) -> Dict[str, List[Dict[str, str]]]:
+def _collect_specific_criteria(file_sections: Dict[str, Dict[str, str]]) -> Dict[str, List[CriteriaSection]]:
+    """
+    Helper function to group per-file sections by specific criteria type.
+    
+    Args:
+        file_sections: Per-file sections keyed by search term, from _process_file
+        
+    Returns:
+        Dictionary with specific criteria types and their extracted text chunks
+    """
+    specific_criteria = {}
+    
+    # file_sections only holds terms the scan found, so absent criteria come out empty
+    for criteria_type, search_terms in CRITERIA_SEARCH_TERMS.items():
+        sections = _extract_criteria_sections(file_sections, criteria_type, search_terms)
+        if sections:  # Only add non-empty results
+            specific_criteria[criteria_type] = sections
+    
+    return specific_criteria
+
+def extract_specific_criteria(file_texts: Dict[str, str],
+                              file_texts_lower: Optional[Dict[str, str]] = None,
+                              executor: Optional[Executor] = None) -> Dict[str, List[CriteriaSection]]:
     """
     Optimized function to extract specific criteria mentioned in tender documents.
+    chunk_tender_documents does this and the paragraph chunking in one pass per file.
     
     Args:
         file_texts: Dictionary mapping file names to their text content
+        file_texts_lower: Same mapping with lowercased content, computed if not given
+        executor: Optional executor used to scan files in parallel
         
     Returns:
         Dictionary with specific criteria types and their extracted text chunks
@@ -274,48 +540,31 @@ def extract_specific_criteria(file_texts: Dict[str, str]) -> Dict[str, List[Dict
     if not valid_files:
         return {}
     
-    # Define search terms for each specific criteria (optimized order - most common first)
-    criteria_search_terms = {
-        "turnover": ["turnover", "annual turnover", "average annual turnover", "financial turnover", "revenue"],
-        "emd_submission": ["earnest money deposit", "emd", "bid security", "mode of emd", "emd submission"],
-        "completion_period": ["completion period", "contract period", "time of completion", "project timeline"],
-        "performance_security": ["performance security", "performance guarantee", "performance bond"],
-        "security_deposit": ["security deposit", "retention money", "retention amount", "withheld amount"],
-        "defect_liability": ["defect liability", "defect liability period", "maintenance period", "warranty period"],
-        "mobilization_advance": ["mobilization advance", "mobilisation advance", "advance payment"],
-        "solvency_working_capital": ["solvency", "working capital", "bank solvency", "credit facility"],
-        "liquid_asset": ["liquid asset", "cash flow", "liquidity", "liquid fund"],
-        "price_variation": ["price variation", "price adjustment", "escalation clause", "price escalation"],
-        "incentive_bonus": ["incentive", "bonus clause", "early completion bonus", "performance bonus"]
-    }
-    
-    specific_criteria = {}
-    combined_text = " ".join(valid_files.values()).lower()
+    contents_lower = [file_texts_lower[k] if file_texts_lower else None for k in valid_files]
     
-    # Process only criteria that have matching terms in the combined text
-    for criteria_type, search_terms in criteria_search_terms.items():
-        # Quick check if any search term exists in combined text
-        if any(term.lower() in combined_text for term in search_terms):
-            sections = _extract_criteria_sections(combined_text, valid_files, criteria_type, search_terms)
-            if sections:  # Only add non-empty results
-                specific_criteria[criteria_type] = sections
+    results = _map_files(executor, partial(_process_file, chunk_paragraphs=False),
+                         list(valid_files), list(valid_files.values()), contents_lower)
+    file_sections = {k: sections for k, (_, sections, _) in zip(valid_files, results)}
     
-    return specific_criteria
+    return _collect_specific_criteria(file_sections)
 
-def chunk_tender_documents(file_texts: Dict[str, str]) -> Dict[str, Any]:
+def chunk_tender_documents(file_texts: Dict[str, str], executor: Optional[Executor] = None) -> Dict[str, Any]:
     """
     Optimized main function to chunk tender documents and extract relevant information.
     
     Args:
         file_texts: Dictionary mapping file names to their text content
+        executor: Optional executor used to process files in parallel
         
     Returns:
-        Dictionary with categorized chunks and specific criteria extractions
+        Dictionary with categorized chunks, specific criteria extractions and the
+        paragraph offsets of each file, for get_context
     """
     if not file_texts:
         return {
             "categorized_chunks": {},
             "specific_criteria": {},
+            "paragraph_spans": {},
             "metadata": {
                 "total_files": 0,
                 "total_text_length": 0,
@@ -327,9 +576,22 @@ def chunk_tender_documents(file_texts: Dict[str, str]) -> Dict[str, Any]:
     # Pre-calculate metadata
     total_text_length = sum(len(text) for text in file_texts.values())
     
-    # Process chunks and criteria in parallel conceptually
-    categorized_chunks = chunk_by_criteria(file_texts)
-    specific_criteria = extract_specific_criteria(file_texts)
+    # Chunk files of at least 100 characters; extract criteria only from longer ones
+    filenames = [k for k, v in file_texts.items() if v and len(v.strip()) >= 100]
+    contents = [file_texts[k] for k in filenames]
+    extract_flags = [len(v.strip()) > 100 for v in contents]
+    
+    # Chunk and extract criteria in a single pass over each file, which lowercases
+    # it once; files are independent, so they can fan out over the executor
+    results = _map_files(executor, _process_file, filenames, contents, [None] * len(filenames),
+                         [True] * len(filenames), extract_flags)
+    
+    categorized_chunks = _categorize_chunks(chunks for chunks, _, _ in results)
+    specific_criteria = _collect_specific_criteria(
+        {k: sections for k, (_, sections, _) in zip(filenames, results)}
+    )
+    # Chunks reference their paragraph by index; get_context slices the context using these
+    paragraph_spans = {k: spans for k, (_, _, spans) in zip(filenames, results)}
     
     # Calculate processing statistics
     total_chunks = sum(len(chunks) for chunks in categorized_chunks.values())
@@ -338,6 +600,7 @@ def chunk_tender_documents(file_texts: Dict[str, str]) -> Dict[str, Any]:
     result = {
         "categorized_chunks": categorized_chunks,
         "specific_criteria": specific_criteria,
+        "paragraph_spans": paragraph_spans,
         "metadata": {
             "total_files": len(file_texts),
             "total_text_length": total_text_length,
@@ -353,6 +616,28 @@ def chunk_tender_documents(file_texts: Dict[str, str]) -> Dict[str, Any]:
     return result
 
 # Additional utility functions for better performance monitoring
+def _distribution(groups: Dict[str, List[Any]]) -> Tuple[Dict[str, int], Optional[str]]:
+    """
+    Count the items in each group and find the largest group in a single pass.
+    
+    Args:
+        groups: Dictionary mapping group names to lists of items
+        
+    Returns:
+        Tuple of the per-group counts and the name of the first largest group (None if empty)
+    """
+    counts = {}
+    largest = None
+    largest_count = -1
+    
+    for name, items in groups.items():
+        count = len(items)
+        counts[name] = count
+        if count > largest_count:
+            largest, largest_count = name, count
+    
+    return counts, largest
+
 def get_processing_stats(result: Dict[str, Any]) -> Dict[str, Any]:
     """
     Get detailed statistics about the processing results.
@@ -363,14 +648,14 @@ def get_processing_stats(result: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         Detailed statistics dictionary
     """
-    categorized = result.get("categorized_chunks", {})
-    criteria = result.get("specific_criteria", {})
+    chunk_distribution, largest_category = _distribution(result.get("categorized_chunks", {}))
+    criteria_distribution, most_common_criteria = _distribution(result.get("specific_criteria", {}))
     
     return {
-        "chunk_distribution": {cat: len(chunks) for cat, chunks in categorized.items()},
-        "criteria_distribution": {crit: len(sections) for crit, sections in criteria.items()},
-        "largest_category": max(categorized.items(), key=lambda x: len(x[1]))[0] if categorized else None,
-        "most_common_criteria": max(criteria.items(), key=lambda x: len(x[1]))[0] if criteria else None,
+        "chunk_distribution": chunk_distribution,
+        "criteria_distribution": criteria_distribution,
+        "largest_category": largest_category,
+        "most_common_criteria": most_common_criteria,
         "processing_efficiency": {
             "chunks_per_file": result["metadata"]["total_chunks"] / max(1, result["metadata"]["total_files"]),
             "criteria_per_file": result["metadata"]["total_criteria_sections"] / max(1, result["metadata"]["total_files"])
@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+from config import CHARS_PER_TOKEN, CONTEXT_TOKEN_BUDGET
+from tender_service import combine_file_texts, estimate_tokens, pack_under_budget
+
+
+class PackUnderBudgetTest(unittest.TestCase):
+    def test_keeps_chunks_that_fit(self):
+        chunks = ["a" * 40, "b" * 40]
+        packed, used = pack_under_budget(chunks, 1000)
+        self.assertEqual(packed, chunks)
+        self.assertEqual(used, estimate_tokens("\n\n---\n\n".join(chunks)))
+
+    def test_oversized_top_chunk_is_skipped_for_smaller_ones(self):
+        chunks = ["x" * 1000 * CHARS_PER_TOKEN, "a" * 40, "b" * 40]
+        packed, used = pack_under_budget(chunks, 100)
+        self.assertEqual(packed, chunks[1:])
+        self.assertLessEqual(used, 100)
+
+    def test_oversized_only_chunk_is_truncated_not_dropped(self):
+        chunks = ["x" * 1000 * CHARS_PER_TOKEN]
+        packed, used = pack_under_budget(chunks, 100)
+        self.assertEqual(packed, ["x" * 100 * CHARS_PER_TOKEN])
+        self.assertEqual(used, 100)
+
+    def test_no_chunks(self):
+        self.assertEqual(pack_under_budget([], 100), ([], 0))
+
+
+class CombineFileTextsTest(unittest.TestCase):
+    CLAUSE = "The bidder shall have a minimum average annual turnover of INR 50 crore in the last three financial years."
+
+    def test_chunk_past_the_truncation_point_is_still_sent(self):
+        filler = "Lorem ipsum dolor sit amet.\n\n" * (CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN // 25)
+        combined = combine_file_texts({"tender.txt": filler + self.CLAUSE})
+        self.assertIn(self.CLAUSE, combined)
+        self.assertLessEqual(estimate_tokens(combined), CONTEXT_TOKEN_BUDGET)
+
+    def test_chunk_in_a_whole_file_is_not_repeated(self):
+        combined = combine_file_texts({"tender.txt": self.CLAUSE + "\n\nShort notice."})
+        self.assertEqual(combined.count(self.CLAUSE), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()